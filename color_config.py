@@ -1,11 +1,10 @@
 """
 颜色配置模块 - 存储所有图表元素使用的颜色配置
 """
-import numpy as np
-from PIL import Image
-from sklearn.cluster import KMeans
-import matplotlib.colors as mcolors
 import os.path
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 
 # 网格样式颜色
 GRID_COLORS = {
@@ -28,8 +27,10 @@ SPECIAL_COLORS = {
     'info_border': '#a8d7fd',
 }
 
-# 从图片提取的颜色组
-COLOR_PALETTES_FROM_IMAGES = {}
+# 从图片提取的颜色组（按最近使用顺序排列，超过上限时淘汰最久未使用的调色板）
+COLOR_PALETTES_FROM_IMAGES = OrderedDict()
+MAX_IMAGE_PALETTES = 64
+_IMAGE_PALETTES_LOCK = threading.Lock()
 
 # 导出所有颜色配置，统一管理
 def get_grid_color(style):
@@ -44,57 +45,145 @@ def get_special_color(name):
     """获取特殊颜色"""
     return SPECIAL_COLORS.get(name, None)
 
-def extract_colors_from_image(image_path, color_count=5, palette_name=None, exclude_white=True):
+# numba编译的颜色直方图累加函数：None表示尚未尝试编译，False表示numba不可用
+_HISTOGRAM_KERNEL = None
+
+def _accumulate_color_histogram(pixels, exclude_white, sums, counts):
+    """逐像素计算亮度、过滤白色并累加到4096个颜色桶中（供numba编译使用）"""
+    for i in range(pixels.shape[0]):
+        r = int(pixels[i, 0])
+        g = int(pixels[i, 1])
+        b = int(pixels[i, 2])
+        if exclude_white and 76 * r + 150 * g + 29 * b >= 240 * 256:
+            continue
+        idx = ((r >> 4) << 8) | ((g >> 4) << 4) | (b >> 4)
+        counts[idx] += 1
+        sums[idx, 0] += r
+        sums[idx, 1] += g
+        sums[idx, 2] += b
+
+def _get_histogram_kernel():
+    """获取numba编译的颜色直方图累加函数，numba不可用时返回None"""
+    global _HISTOGRAM_KERNEL
+    if _HISTOGRAM_KERNEL is None:
+        try:
+            import numba
+            _HISTOGRAM_KERNEL = numba.njit(cache=True)(_accumulate_color_histogram)
+        except ImportError:
+            _HISTOGRAM_KERNEL = False
+    return _HISTOGRAM_KERNEL or None
+
+def _color_histogram(pixels, exclude_white):
     """
-    从图片中提取指定数量的主要颜色，并可选地将其保存为命名调色板
+    将像素量化为每通道4位的颜色桶（共4096个），统计每个桶的像素数量和颜色总和
     
     参数:
-        image_path: 图片文件路径
-        color_count: 要提取的颜色数量，默认为5
-        palette_name: 保存调色板的名称，如果为None则不保存
-        exclude_white: 是否排除白色（和接近白色的颜色），默认为True
+        pixels: 形状为(N, 3)的uint8 RGB像素数组
+        exclude_white: 是否排除白色（和接近白色的颜色）
     
     返回:
-        提取的颜色列表，格式为十六进制颜色代码
+        (sums, counts)：形状为(4096, 3)的颜色总和与形状为(4096,)的像素数量
     """
-    if not os.path.exists(image_path):
-        raise FileNotFoundError(f"图片文件 '{image_path}' 不存在")
+    import numpy as np
+    
+    kernel = _get_histogram_kernel()
+    if kernel is not None:
+        sums = np.zeros((4096, 3), dtype=np.int64)
+        counts = np.zeros(4096, dtype=np.int64)
+        kernel(np.ascontiguousarray(pixels), exclude_white, sums, counts)
+        return sums, counts
+    
+    if exclude_white:
+        # 计算像素亮度（0.299R + 0.587G + 0.114B，按256倍整数权重计算），排除亮度过高的像素（白色或接近白色）
+        brightness = pixels.astype(np.uint16) @ np.array([76, 150, 29], dtype=np.uint16)
+        pixels = pixels[brightness < 240 * 256]
+    
+    quantized = pixels >> 4
+    bucket_idx = (quantized[:, 0].astype(np.intp) << 8) | (quantized[:, 1] << 4) | quantized[:, 2]
+    counts = np.bincount(bucket_idx, minlength=4096)
+    sums = np.stack([np.bincount(bucket_idx, weights=pixels[:, c], minlength=4096) for c in range(3)], axis=1)
+    return sums, counts
+
+@lru_cache(maxsize=64)
+def _extract_colors_cached(image_path, color_count, exclude_white, mtime):
+    """
+    从图片中提取主要颜色（结果按图片路径、参数和修改时间缓存）
+    
+    返回:
+        提取的颜色元组，格式为十六进制颜色代码；图片中的颜色桶不足color_count个时只返回实际存在的颜色
+    """
+    # 延迟导入图像处理依赖，避免导入本包时产生额外开销
+    import numpy as np
+    from PIL import Image
     
-    # 读取图片
+    # 读取图片，JPEG图片可直接以接近目标尺寸的分辨率解码
     img = Image.open(image_path)
+    img.draft('RGB', (200, 200))
     
-    # 调整图片大小以加快处理速度
-    img.thumbnail((200, 200))
+    # 先转换为RGB，再调整图片大小以加快处理速度
+    if img.mode != 'RGB':
+        img = img.convert('RGB')
+    
+    # 大图先按整数倍快速缩小，再缩放到目标尺寸
+    factor = min(img.size) // 200
+    if factor > 1:
+        img = img.reduce(factor)
+    img.thumbnail((200, 200), Image.Resampling.BILINEAR)
     
     # 将图片转换为像素数组
-    pixels = np.array(img.convert('RGB')).reshape(-1, 3)
+    pixels = np.asarray(img, dtype=np.uint8).reshape(-1, 3)
     
-    # 如果需要排除白色
-    if exclude_white:
-        # 计算像素亮度，排除亮度过高的像素（白色或接近白色）
-        brightness = np.sqrt(0.299 * pixels[:, 0]**2 + 0.587 * pixels[:, 1]**2 + 0.114 * pixels[:, 2]**2)
-        pixels = pixels[brightness < 240]  # 排除亮度过高的像素
+    # 统计颜色直方图（可选地排除白色和接近白色的像素）
+    sums, counts = _color_histogram(pixels, exclude_white)
+    
+    # 确保有像素可用于提取颜色
+    nonzero = np.count_nonzero(counts)
+    if nonzero == 0:
+        raise ValueError("图片中没有可用于提取颜色的非白色像素")
     
-    # 确保有足够的像素进行聚类
-    if len(pixels) < color_count:
-        raise ValueError("图片中没有足够的非白色像素来提取指定数量的颜色")
+    # 颜色种类较少的图片（如纯色图标、图表）只返回实际存在的颜色，不重复填充
+    color_count = min(color_count, nonzero)
     
-    # 使用K-means聚类算法提取主要颜色
-    kmeans = KMeans(n_clusters=color_count, random_state=42, n_init=10)
-    kmeans.fit(pixels)
+    # 选取像素数量最多的颜色桶，并按像素数量从多到少排序
+    top = np.argpartition(counts, -color_count)[-color_count:]
+    top = top[np.argsort(counts[top])[::-1]]
     
-    # 获取聚类中心（主要颜色）
-    colors = kmeans.cluster_centers_.astype(int)
+    # 以每个选中颜色桶内像素的平均值作为主要颜色
+    colors = np.rint(sums[top] / counts[top, None]).clip(0, 255).astype(np.uint8)
     
     # 将RGB颜色转换为十六进制颜色代码
-    hex_colors = []
-    for color in colors:
-        hex_color = mcolors.to_hex([color[0]/255, color[1]/255, color[2]/255])
-        hex_colors.append(hex_color)
+    return tuple('#%02x%02x%02x' % (r, g, b) for r, g, b in colors)
+
+def extract_colors_from_image(image_path, color_count=5, palette_name=None, exclude_white=True):
+    """
+    从图片中提取指定数量的主要颜色，并可选地将其保存为命名调色板
+    
+    参数:
+        image_path: 图片文件路径
+        color_count: 要提取的颜色数量（至少为1），默认为5
+        palette_name: 保存调色板的名称，如果为None则不保存
+        exclude_white: 是否排除白色（和接近白色的颜色），默认为True
+    
+    返回:
+        提取的颜色列表，格式为十六进制颜色代码；图片中的颜色种类（按每通道4位量化）少于color_count时，
+        只返回实际存在的颜色，因此列表长度可能小于color_count
+    """
+    if color_count < 1:
+        raise ValueError(f"颜色数量必须至少为1，当前为 {color_count}")
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"图片文件 '{image_path}' 不存在")
+    
+    # 同一图片未被修改时直接复用之前的提取结果
+    hex_colors = list(_extract_colors_cached(os.path.abspath(image_path), color_count, 
+                                             exclude_white, os.path.getmtime(image_path)))
     
     # 如果指定了调色板名称，则保存调色板
     if palette_name:
-        COLOR_PALETTES_FROM_IMAGES[palette_name] = hex_colors
+        with _IMAGE_PALETTES_LOCK:
+            COLOR_PALETTES_FROM_IMAGES[palette_name] = hex_colors
+            COLOR_PALETTES_FROM_IMAGES.move_to_end(palette_name)
+            while len(COLOR_PALETTES_FROM_IMAGES) > MAX_IMAGE_PALETTES:
+                COLOR_PALETTES_FROM_IMAGES.popitem(last=False)
     
     return hex_colors
 
@@ -108,7 +197,11 @@ def get_image_palette(name):
     返回:
         调色板颜色列表，如果调色板不存在则返回None
     """
-    return COLOR_PALETTES_FROM_IMAGES.get(name, None)
+    with _IMAGE_PALETTES_LOCK:
+        palette = COLOR_PALETTES_FROM_IMAGES.get(name, None)
+        if palette is not None:
+            COLOR_PALETTES_FROM_IMAGES.move_to_end(name)
+        return palette
 
 def list_image_palettes():
     """
@@ -117,4 +210,5 @@ def list_image_palettes():
     返回:
         调色板名称列表
     """
-    return list(COLOR_PALETTES_FROM_IMAGES.keys()) 
\ No newline at end of file
+    with _IMAGE_PALETTES_LOCK:
+        return list(COLOR_PALETTES_FROM_IMAGES.keys()) 
\ No newline at end of file
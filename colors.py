@@ -1,14 +1,44 @@
 """
 颜色管理模块 - 管理所有科研绘图相关的颜色配置
 """
+import itertools
+from functools import lru_cache
 import matplotlib.colors as mcolors
 import matplotlib.pyplot as plt
 import numpy as np
-from typing import Dict, List, Tuple, Union, Optional
+from typing import Dict, Iterator, List, Tuple, Union, Optional
 from .color_config import extract_colors_from_image, get_image_palette, list_image_palettes
 
+def _cached(func, *args):
+    """调用按颜色内容缓存的函数，颜色不可哈希（如列表或数组）时直接计算"""
+    try:
+        return func(*args)
+    except TypeError:
+        return func.__wrapped__(*args)
+
+@lru_cache(maxsize=128)
+def _sample_gradient(colors, n):
+    """在[0, 1]区间内均匀采样渐变色的n个颜色（按颜色内容和数量缓存）"""
+    cmap = mcolors.LinearSegmentedColormap.from_list('custom_gradient', colors)
+    rgb = (cmap(np.linspace(0, 1, n))[:, :3] * 255 + 0.5).astype(np.uint8)
+    return tuple('#%02x%02x%02x' % (r, g, b) for r, g, b in rgb)
+
+@lru_cache(maxsize=128)
+def _palette_rgba(colors):
+    """将调色板颜色转换为只读的float32 RGBA数组（按颜色内容缓存）"""
+    rgba = np.ascontiguousarray(mcolors.to_rgba_array(colors), dtype=np.float32)
+    rgba.setflags(write=False)
+    return rgba
+
+@lru_cache(maxsize=128)
+def _gradient_colormap(name, colors):
+    """根据渐变色创建colormap（按名称和颜色内容缓存）"""
+    return mcolors.LinearSegmentedColormap.from_list(name, colors)
+
 # 基础颜色字典
 class ColorManager:
+    __slots__ = ('base_colors', 'palettes', 'gradients', 'roles', '_lookup')
+    
     def __init__(self):
         # 基础颜色定义
         self.base_colors = {
@@ -68,15 +98,16 @@ class ColorManager:
             'text': self.base_colors['foreground'],
             'annotation': self.base_colors['foreground_alt'],
         }
+        
+        # 颜色名称到颜色值的合并索引（基础颜色优先于颜色角色）
+        self._lookup = {**self.roles, **self.base_colors}
     
     def get_color(self, name: str) -> str:
         """获取单个颜色"""
-        if name in self.base_colors:
-            return self.base_colors[name]
-        elif name in self.roles:
-            return self.roles[name]
-        else:
+        color = self._lookup.get(name)
+        if color is None:
             raise ValueError(f"颜色 '{name}' 未找到")
+        return color
     
     def get_palette(self, name: str = 'default', n: Optional[int] = None) -> List[str]:
         """获取调色板颜色列表"""
@@ -91,18 +122,32 @@ class ColorManager:
         
         return palette
     
+    def get_palette_array(self, name: str = 'default', n: Optional[int] = None) -> np.ndarray:
+        """获取调色板的只读RGBA数组（形状为(N, 4)的float32数组，可直接传给matplotlib）"""
+        if name not in self.palettes:
+            raise ValueError(f"调色板 '{name}' 未找到")
+        
+        # 按调色板的当前内容缓存，调色板被修改后自动重新计算
+        rgba = _cached(_palette_rgba, tuple(self.palettes[name]))
+        
+        # 如果指定了颜色数量，循环使用调色板颜色
+        if n is not None:
+            rgba = rgba[np.arange(n) % len(rgba)]
+            rgba.setflags(write=False)
+        
+        return rgba
+    
+    def get_palette_cycle(self, name: str = 'default') -> Iterator[np.ndarray]:
+        """获取循环迭代调色板RGBA颜色的迭代器"""
+        return itertools.cycle(self.get_palette_array(name))
+    
     def get_gradient(self, name: str, n: int = 3) -> List[str]:
         """获取渐变色列表"""
         if name not in self.gradients:
             raise ValueError(f"渐变色 '{name}' 未找到")
         
-        gradient = self.gradients[name]
-        
-        # 创建颜色映射
-        cmap = mcolors.LinearSegmentedColormap.from_list('custom_gradient', gradient)
-        
-        # 返回n个颜色
-        return [mcolors.to_hex(cmap(i/(n-1))) for i in range(n)]
+        # 按渐变色的当前内容缓存采样结果，渐变色被修改后自动重新计算；返回新列表，避免调用方修改缓存内容
+        return list(_cached(_sample_gradient, tuple(self.gradients[name]), n))
     
     def create_custom_palette(self, name: str, colors: List[str]) -> None:
         """创建自定义调色板"""
@@ -115,15 +160,20 @@ class ColorManager:
     def update_role(self, role_name: str, color: str) -> None:
         """更新颜色角色"""
         self.roles[role_name] = color
+        if role_name not in self.base_colors:
+            self._lookup[role_name] = color
     
     def add_base_color(self, name: str, color: str) -> None:
         """添加新的基础颜色"""
         self.base_colors[name] = color
+        self._lookup[name] = color
     
     def get_colormap(self, name: str) -> mcolors.LinearSegmentedColormap:
         """获取matplotlib兼容的colormap"""
         if name in self.gradients:
-            return mcolors.LinearSegmentedColormap.from_list(name, self.gradients[name])
+            cmap = _cached(_gradient_colormap, name, tuple(self.gradients[name]))
+            # 返回副本，避免调用方的set_bad()/set_under()等修改影响其他调用方
+            return cmap.copy()
         
         # 尝试使用matplotlib内置colormap
         try:
@@ -138,8 +188,10 @@ class ColorManager:
         
         colors = self.palettes[name]
         fig, ax = plt.subplots(figsize=(10, 1))
-        for i, color in enumerate(colors):
-            ax.add_patch(plt.Rectangle((i, 0), 1, 1, color=color))
+        
+        # 将所有颜色绘制为一行图像
+        swatches = np.array([[mcolors.to_rgb(color) for color in colors]])
+        ax.imshow(swatches, aspect='auto', extent=(0, len(colors), 0, 1))
         
         ax.set_xlim(0, len(colors))
         ax.set_ylim(0, 1)
@@ -151,17 +203,22 @@ class ColorManager:
 
     def show_all_palettes(self) -> None:
         """展示所有调色板"""
-        fig, axes = plt.subplots(len(self.palettes), 1, figsize=(10, len(self.palettes)))
+        names = list(self.palettes)
+        max_len = max(len(palette) for palette in self.palettes.values())
         
-        for i, (name, colors) in enumerate(self.palettes.items()):
-            ax = axes[i]
-            for j, color in enumerate(colors):
-                ax.add_patch(plt.Rectangle((j, 0), 1, 1, color=color))
-            
-            ax.set_xlim(0, max(len(palette) for palette in self.palettes.values()))
-            ax.set_ylim(0, 1)
-            ax.set_yticks([])
-            ax.set_title(name)
+        # 每个调色板占一行，较短的调色板以透明像素补齐
+        swatches = np.zeros((len(names), max_len, 4))
+        for i, name in enumerate(names):
+            colors = self.palettes[name]
+            swatches[i, :len(colors)] = mcolors.to_rgba_array(colors)
+        
+        fig, ax = plt.subplots(figsize=(10, len(names)))
+        ax.imshow(swatches, aspect='auto', extent=(0, max_len, len(names), 0))
+        
+        ax.set_xlim(0, max_len)
+        ax.set_ylim(len(names), 0)
+        ax.set_yticks([i + 0.5 for i in range(len(names))])
+        ax.set_yticklabels(names)
         
         plt.tight_layout()
         plt.show()
@@ -173,8 +230,10 @@ class ColorManager:
         
         colors = self.get_gradient(name, n)
         fig, ax = plt.subplots(figsize=(10, 1))
-        for i, color in enumerate(colors):
-            ax.add_patch(plt.Rectangle((i, 0), 1, 1, color=color))
+        
+        # 将渐变色绘制为一行图像
+        swatches = np.array([[mcolors.to_rgb(color) for color in colors]])
+        ax.imshow(swatches, aspect='auto', extent=(0, len(colors), 0, 1))
         
         ax.set_xlim(0, len(colors))
         ax.set_ylim(0, 1)
@@ -190,11 +249,11 @@ class ColorManager:
         参数:
             name: 调色板名称
             image_path: 图片文件路径
-            color_count: 要提取的颜色数量，默认为5
+            color_count: 要提取的颜色数量（至少为1），默认为5
             exclude_white: 是否排除白色（和接近白色的颜色），默认为True
             
         返回:
-            提取的颜色列表
+            提取的颜色列表（图片中颜色种类不足时，数量可能少于color_count）
         """
         # 从图片中提取颜色
         colors = extract_colors_from_image(image_path, color_count, exclude_white=exclude_white)
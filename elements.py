@@ -12,25 +12,69 @@ from matplotlib.colorbar import Colorbar
 
 class ElementManager:
     """图表元素管理器类"""
+    __slots__ = ('annotation_styles', 'textbox_styles', 'grid_styles', 'label_styles',
+                 'legend_styles', 'line_styles', 'marker_styles', '_custom_styles')
     
     def __init__(self):
+        # 预设样式字典，由 _init_default_styles 填充内置样式
+        self.annotation_styles = {}
+        self.textbox_styles = {}
+        self.grid_styles = {}
+        self.label_styles = {}
+        self.legend_styles = {}
+        self._init_default_styles()
+        
+        # 通过add_custom_*_style注册的样式，记录为(样式字典属性名, 样式名称)
+        self._custom_styles = set()
+        
+        # 标准线型
+        self.line_styles = {
+            'solid': '-',
+            'dashed': '--',
+            'dotted': ':',
+            'dash_dot': '-.',
+            'marker_only': '',
+        }
+        
+        # 标准标记类型
+        self.marker_styles = {
+            'circle': 'o',
+            'square': 's',
+            'triangle': '^',
+            'diamond': 'D',
+            'plus': '+',
+            'x': 'x',
+            'star': '*',
+            'dot': '.',
+            'none': '',
+        }
+    
+    def _init_default_styles(self) -> None:
+        """根据当前颜色配置生成内置样式"""
+        # 预先解析样式中重复使用的颜色
+        foreground = colors.get_color('foreground')
+        foreground_alt = colors.get_color('foreground_alt')
+        accent = colors.get_color('accent')
+        white = get_common_color('white')
+        gray = get_common_color('gray')
+        
         # 存储预设的标注样式
-        self.annotation_styles = {
+        self.annotation_styles.update({
             'default': {
                 'xytext': (0, 10),
                 'textcoords': 'offset points',
                 'fontsize': 10,
-                'color': colors.get_color('foreground'),
+                'color': foreground,
                 'ha': 'center',
                 'va': 'bottom',
-                'bbox': dict(boxstyle='round,pad=0.3', fc=get_common_color('white'), ec=get_common_color('gray'), alpha=0.7),
-                'arrowprops': dict(arrowstyle='->', connectionstyle='arc3,rad=0', color=get_common_color('gray')),
+                'bbox': dict(boxstyle='round,pad=0.3', fc=white, ec=gray, alpha=0.7),
+                'arrowprops': dict(arrowstyle='->', connectionstyle='arc3,rad=0', color=gray),
             },
             'simple': {
                 'xytext': (0, 10),
                 'textcoords': 'offset points',
                 'fontsize': 10,
-                'color': colors.get_color('foreground'),
+                'color': foreground,
                 'ha': 'center',
                 'va': 'bottom',
             },
@@ -38,51 +82,51 @@ class ElementManager:
                 'xytext': (0, 15),
                 'textcoords': 'offset points',
                 'fontsize': 10,
-                'color': colors.get_color('foreground'),
+                'color': foreground,
                 'ha': 'center',
                 'va': 'bottom',
-                'arrowprops': dict(arrowstyle='-', color=get_common_color('gray')),
+                'arrowprops': dict(arrowstyle='-', color=gray),
             },
             'callout': {
                 'xytext': (30, 20),
                 'textcoords': 'offset points',
                 'fontsize': 10,
-                'color': colors.get_color('foreground'),
+                'color': foreground,
                 'ha': 'left',
                 'va': 'center',
-                'bbox': dict(boxstyle='round,pad=0.5', fc=get_common_color('white'), ec=get_common_color('gray'), alpha=0.7),
-                'arrowprops': dict(arrowstyle='fancy', connectionstyle='arc3,rad=0.3', color=get_common_color('gray')),
+                'bbox': dict(boxstyle='round,pad=0.5', fc=white, ec=gray, alpha=0.7),
+                'arrowprops': dict(arrowstyle='fancy', connectionstyle='arc3,rad=0.3', color=gray),
             }
-        }
+        })
         
         # 存储预设的文本框样式
-        self.textbox_styles = {
+        self.textbox_styles.update({
             'default': {
                 'fontsize': 10,
-                'color': colors.get_color('foreground'),
-                'bbox': dict(boxstyle='round,pad=0.5', fc=get_common_color('white'), ec=get_common_color('gray'), alpha=0.7),
+                'color': foreground,
+                'bbox': dict(boxstyle='round,pad=0.5', fc=white, ec=gray, alpha=0.7),
             },
             'clean': {
                 'fontsize': 10,
-                'color': colors.get_color('foreground'),
-                'bbox': dict(boxstyle='round,pad=0.3', fc=get_common_color('white'), ec=get_common_color('white'), alpha=0.5),
+                'color': foreground,
+                'bbox': dict(boxstyle='round,pad=0.3', fc=white, ec=white, alpha=0.5),
             },
             'highlight': {
                 'fontsize': 11,
-                'color': get_common_color('white'),
+                'color': white,
                 'weight': 'bold',
-                'bbox': dict(boxstyle='round,pad=0.5', fc=colors.get_color('accent'), ec='none', alpha=0.9),
+                'bbox': dict(boxstyle='round,pad=0.5', fc=accent, ec='none', alpha=0.9),
             },
             'info': {
                 'fontsize': 9,
-                'color': colors.get_color('foreground'),
+                'color': foreground,
                 'style': 'italic',
                 'bbox': dict(boxstyle='round,pad=0.3', fc=get_special_color('info_background'), ec=get_special_color('info_border'), alpha=0.9),
             }
-        }
+        })
         
         # 存储预设的网格样式
-        self.grid_styles = {
+        self.grid_styles.update({
             'default': {
                 'visible': True,
                 'color': get_grid_color('default'),
@@ -114,48 +158,48 @@ class ElementManager:
                 'linewidth': 0.5,
                 'alpha': 0.3,
             }
-        }
+        })
         
         # 存储预设的标签样式
-        self.label_styles = {
+        self.label_styles.update({
             'default': {
                 'fontsize': 10,
-                'color': colors.get_color('foreground'),
+                'color': foreground,
                 'weight': 'normal',
             },
             'bold': {
                 'fontsize': 10,
-                'color': colors.get_color('foreground'),
+                'color': foreground,
                 'weight': 'bold',
             },
             'large': {
                 'fontsize': 12,
-                'color': colors.get_color('foreground'),
+                'color': foreground,
                 'weight': 'normal',
             },
             'highlight': {
                 'fontsize': 10,
-                'color': colors.get_color('accent'),
+                'color': accent,
                 'weight': 'bold',
             }
-        }
+        })
         
         # 存储预设的图例样式
-        self.legend_styles = {
+        self.legend_styles.update({
             'default': {
                 'loc': 'best',
                 'frameon': True,
                 'framealpha': 0.8,
-                'facecolor': get_common_color('white'),
-                'edgecolor': colors.get_color('foreground_alt'),
+                'facecolor': white,
+                'edgecolor': foreground_alt,
             },
             'outside': {
                 'loc': 'center left',
                 'bbox_to_anchor': (1.05, 0.5),
                 'frameon': True,
                 'framealpha': 0.8,
-                'facecolor': get_common_color('white'),
-                'edgecolor': colors.get_color('foreground_alt'),
+                'facecolor': white,
+                'edgecolor': foreground_alt,
             },
             'minimal': {
                 'loc': 'best',
@@ -165,45 +209,45 @@ class ElementManager:
                 'loc': 'best',
                 'frameon': True,
                 'framealpha': 1.0,
-                'facecolor': get_common_color('white'),
+                'facecolor': white,
                 'edgecolor': get_common_color('black'),
                 'shadow': True,
             }
-        }
-        
-        # 标准线型
-        self.line_styles = {
-            'solid': '-',
-            'dashed': '--',
-            'dotted': ':',
-            'dash_dot': '-.',
-            'marker_only': '',
-        }
-        
-        # 标准标记类型
-        self.marker_styles = {
-            'circle': 'o',
-            'square': 's',
-            'triangle': '^',
-            'diamond': 'D',
-            'plus': '+',
-            'x': 'x',
-            'star': '*',
-            'dot': '.',
-            'none': '',
-        }
-
+        })
+    
+    def refresh_styles(self) -> None:
+        """
+        通过colors.add_base_color修改基础颜色（foreground、foreground_alt、accent）后重新生成内置样式
+        
+        注意: 基础颜色优先于同名颜色角色，仅用update_role修改角色不会影响内置样式；
+        通过add_custom_*_style注册的样式（包括与内置样式同名的样式）保持不变
+        """
+        # 已从样式字典中删除的自定义样式不再保留记录
+        self._custom_styles = {(attr, name) for attr, name in self._custom_styles
+                               if name in getattr(self, attr)}
+        custom = [(attr, name, getattr(self, attr)[name]) for attr, name in self._custom_styles]
+        self._init_default_styles()
+        for attr, name, style in custom:
+            getattr(self, attr)[name] = style
+    
+    @staticmethod
+    def _merge_style(template: Dict[str, Any], kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """合并预设样式与自定义参数，并复制嵌套的bbox/arrowprops字典，避免预设样式被修改"""
+        style_params = {**template, **kwargs}
+        for key in ('bbox', 'arrowprops'):
+            if isinstance(style_params.get(key), dict):
+                style_params[key] = dict(style_params[key])
+        return style_params
+    
     def add_annotation(self, ax: plt.Axes, x: float, y: float, text: str, 
                        style: str = 'default', **kwargs) -> plt.Annotation:
         """添加标注"""
-        if style not in self.annotation_styles:
+        template = self.annotation_styles.get(style)
+        if template is None:
             raise ValueError(f"标注样式 '{style}' 未找到")
         
-        # 获取预设样式
-        style_params = self.annotation_styles[style].copy()
-        
-        # 更新自定义参数
-        style_params.update(kwargs)
+        # 合并预设样式与自定义参数
+        style_params = self._merge_style(template, kwargs)
         
         # 创建标注
         annotation = ax.annotate(text, xy=(x, y), **style_params)
@@ -213,14 +257,12 @@ class ElementManager:
     def add_textbox(self, ax: plt.Axes, x: float, y: float, text: str, 
                     style: str = 'default', **kwargs) -> plt.Text:
         """添加文本框"""
-        if style not in self.textbox_styles:
+        template = self.textbox_styles.get(style)
+        if template is None:
             raise ValueError(f"文本框样式 '{style}' 未找到")
         
-        # 获取预设样式
-        style_params = self.textbox_styles[style].copy()
-        
-        # 更新自定义参数
-        style_params.update(kwargs)
+        # 合并预设样式与自定义参数
+        style_params = self._merge_style(template, kwargs)
         
         # 创建文本
         text_obj = ax.text(x, y, text, **style_params)
@@ -230,17 +272,13 @@ class ElementManager:
     def set_grid(self, ax: plt.Axes, style: str = 'default', 
                  which: str = 'major', axis: str = 'both') -> None:
         """设置网格"""
-        if style not in self.grid_styles:
+        template = self.grid_styles.get(style)
+        if template is None:
             raise ValueError(f"网格样式 '{style}' 未找到")
         
-        # 获取网格样式
-        grid_params = self.grid_styles[style].copy()
-        
-        # 移除visible参数，因为我们总是显示网格
-        visible = grid_params.pop('visible', True)
-        
-        if visible:
+        if template.get('visible', True):
             # 应用网格，不传递visible参数
+            grid_params = {k: v for k, v in template.items() if k != 'visible'}
             ax.grid(True, which=which, axis=axis, **grid_params)
         else:
             # 关闭网格
@@ -250,12 +288,11 @@ class ElementManager:
                    xlabel: Optional[str] = None, ylabel: Optional[str] = None, 
                    style: str = 'default') -> None:
         """设置轴标签"""
-        if style not in self.label_styles:
+        # 获取标签样式（只读，无需复制）
+        label_params = self.label_styles.get(style)
+        if label_params is None:
             raise ValueError(f"标签样式 '{style}' 未找到")
         
-        # 获取标签样式
-        label_params = self.label_styles[style].copy()
-        
         # 设置标题
         if title is not None:
             ax.set_title(title, fontsize=label_params.get('fontsize') + 2, 
@@ -272,14 +309,12 @@ class ElementManager:
     
     def set_legend(self, ax: plt.Axes, style: str = 'default', **kwargs) -> Legend:
         """设置图例"""
-        if style not in self.legend_styles:
+        template = self.legend_styles.get(style)
+        if template is None:
             raise ValueError(f"图例样式 '{style}' 未找到")
         
-        # 获取图例样式
-        legend_params = self.legend_styles[style].copy()
-        
-        # 更新自定义参数
-        legend_params.update(kwargs)
+        # 合并预设样式与自定义参数
+        legend_params = {**template, **kwargs}
         
         # 创建图例
         legend = ax.legend(**legend_params)
@@ -327,22 +362,27 @@ class ElementManager:
     def add_custom_annotation_style(self, name: str, style_params: Dict[str, Any]) -> None:
         """添加自定义标注样式"""
         self.annotation_styles[name] = style_params
+        self._custom_styles.add(('annotation_styles', name))
     
     def add_custom_textbox_style(self, name: str, style_params: Dict[str, Any]) -> None:
         """添加自定义文本框样式"""
         self.textbox_styles[name] = style_params
+        self._custom_styles.add(('textbox_styles', name))
     
     def add_custom_grid_style(self, name: str, style_params: Dict[str, Any]) -> None:
         """添加自定义网格样式"""
         self.grid_styles[name] = style_params
+        self._custom_styles.add(('grid_styles', name))
     
     def add_custom_label_style(self, name: str, style_params: Dict[str, Any]) -> None:
         """添加自定义标签样式"""
         self.label_styles[name] = style_params
+        self._custom_styles.add(('label_styles', name))
     
     def add_custom_legend_style(self, name: str, style_params: Dict[str, Any]) -> None:
         """添加自定义图例样式"""
         self.legend_styles[name] = style_params
+        self._custom_styles.add(('legend_styles', name))
     
     def style_spines(self, ax: plt.Axes, color: str = None, width: float = None,
                      visible: Dict[str, bool] = None) -> None:
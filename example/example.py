@@ -1,13 +1,59 @@
 """
 scivis使用示例 - 展示科研绘图环境一体化管理系统的主要功能
 """
+import os
+from functools import lru_cache
+
 import numpy as np
 import pandas as pd
+import matplotlib
+
+# 设置环境变量SCIVIS_HEADLESS时使用无界面的Agg后端，只保存图表而不显示
+SHOW = not os.environ.get('SCIVIS_HEADLESS')
+if not SHOW:
+    matplotlib.use('Agg')
+
 import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
 
 # 导入scivis包
 import scivis_wrx as sv
 
+@lru_cache(maxsize=None)
+def _color(name):
+    """获取颜色（结果缓存，避免示例中重复查询）"""
+    return sv.colors.get_color(name)
+
+@lru_cache(maxsize=None)
+def _palette(name, n=None):
+    """获取调色板颜色列表（结果缓存，避免示例中重复查询）"""
+    return sv.colors.get_palette(name, n=n)
+
+def _damped_sine(x):
+    """生成衰减正弦数据 sin(x)·exp(-0.1x)（原地运算，避免中间数组）"""
+    y = np.multiply(x, -0.1)
+    np.exp(y, out=y)
+    y *= np.sin(x)
+    return y
+
+def _daily_series(x, base, amplitude, wave, noise):
+    """生成以24小时为周期的示例数据 base + amplitude·wave(πx/12) + noise（原地运算，避免中间数组）"""
+    y = np.multiply(x, np.pi / 12)
+    wave(y, out=y)
+    y *= amplitude
+    y += base
+    y += noise
+    return y
+
+# 多个示例共用的波形数据（导入时计算一次，设为只读以防被示例修改）
+_X100 = np.linspace(0, 10, 100)
+_SIN = np.sin(_X100)
+_COS = np.cos(_X100)
+_DAMPED = _damped_sine(_X100)
+for _arr in (_X100, _SIN, _COS, _DAMPED):
+    _arr.setflags(write=False)
+del _arr
+
 def example_basic_usage():
     """展示基本用法"""
     print("=== 基本用法示例 ===")
@@ -19,13 +65,13 @@ def example_basic_usage():
     fig, ax = plt.subplots(figsize=(8, 5))
     
     # 使用颜色系统
-    primary_color = sv.colors.get_color('primary')
-    secondary_color = sv.colors.get_color('secondary')
+    primary_color = _color('primary')
+    secondary_color = _color('secondary')
     
     # 生成数据
-    x = np.linspace(0, 10, 100)
-    y1 = np.sin(x)
-    y2 = np.cos(x)
+    x = _X100
+    y1 = _SIN
+    y2 = _COS
     
     # 绘制数据
     ax.plot(x, y1, color=primary_color, label='sin(x)')
@@ -46,15 +92,19 @@ def example_basic_usage():
     print("已保存: outputs/basic_example.png")
     
     # 显示图表
-    plt.show()
+    if SHOW:
+        plt.show()
+    
+    # 释放图表占用的资源
+    plt.close(fig)
 
 def example_theme_comparison():
     """比较不同主题的效果"""
     print("\n=== 主题比较示例 ===")
     
     # 准备数据
-    x = np.linspace(0, 10, 100)
-    y = np.sin(x) * np.exp(-0.1 * x)
+    x = _X100
+    y = _DAMPED
     
     # 获取所有主题
     theme_names = sv.themes.list_themes()
@@ -66,20 +116,15 @@ def example_theme_comparison():
     
     # 为每个子图应用不同主题
     for i, theme_name in enumerate(theme_names[:4]):  # 最多展示4个主题
-        # 保存当前设置
-        old_params = plt.rcParams.copy()
-        
-        # 应用主题
-        sv.themes.apply_theme(theme_name)
-        
-        # 绘制数据
-        axes[i].plot(x, y)
-        axes[i].set_title(f"主题: {theme_name}")
-        axes[i].set_xlabel("X")
-        axes[i].set_ylabel("Y")
-        
-        # 恢复原来的设置
-        plt.rcParams.update(old_params)
+        # 在rc_context中应用主题，退出时自动恢复原来的设置
+        with plt.rc_context():
+            sv.themes.apply_theme(theme_name)
+            
+            # 绘制数据
+            axes[i].plot(x, y)
+            axes[i].set_title(f"主题: {theme_name}")
+            axes[i].set_xlabel("X")
+            axes[i].set_ylabel("Y")
     
     # 整体标题
     fig.suptitle("不同主题的比较", fontsize=16)
@@ -91,7 +136,11 @@ def example_theme_comparison():
     print("已保存: outputs/theme_comparison.png")
     
     # 显示图表
-    plt.show()
+    if SHOW:
+        plt.show()
+    
+    # 释放图表占用的资源
+    plt.close(fig)
 
 def example_color_palettes():
     """展示颜色调色板"""
@@ -107,26 +156,25 @@ def example_color_palettes():
     # 为每个调色板创建一个水平条
     bar_height = 0.8
     y_positions = range(len(palette_names))
-    
-    for i, palette_name in enumerate(palette_names):
-        # 获取调色板颜色
-        colors = sv.colors.get_palette(palette_name)
+    palettes = [_palette(name) for name in palette_names]
+    max_len = max(len(colors) for colors in palettes)
+    
+    for i, colors in enumerate(palettes):
+        # 将整个调色板作为一张图像绘制（每个颜色块宽度为1）
+        rgba = mcolors.to_rgba_array(colors)
+        ax.imshow(rgba[np.newaxis], aspect='auto', interpolation='nearest',
+                  extent=(0, len(colors), i - bar_height/2, i + bar_height/2))
         
-        # 绘制每个调色板中的颜色块
-        start_x = 0
+        # 一次性计算整个调色板的相对亮度（0.299R + 0.587G + 0.114B），亮度小于0.5为深色
+        is_dark = rgba[:, :3] @ np.array([0.299, 0.587, 0.114]) < 0.5
+        
+        # 为每个颜色块添加标签
         for j, color in enumerate(colors):
-            width = 1  # 每个颜色块的宽度
-            ax.add_patch(plt.Rectangle((start_x, i - bar_height/2), width, bar_height, color=color))
-            
-            # 如果颜色块足够宽，添加标签
-            if width >= 0.4:
-                ax.text(start_x + width/2, i, color, ha='center', va='center', 
-                      fontsize=8, color='white' if sv.utils.is_dark_color(color) else 'black')
-            
-            start_x += width
+            ax.text(j + 0.5, i, color, ha='center', va='center', 
+                  fontsize=8, color='white' if is_dark[j] else 'black')
     
     # 设置坐标轴
-    ax.set_xlim(0, max([len(sv.colors.get_palette(name)) for name in palette_names]))
+    ax.set_xlim(0, max_len)
     ax.set_ylim(-0.5, len(palette_names) - 0.5)
     ax.set_yticks(y_positions)
     ax.set_yticklabels(palette_names)
@@ -147,7 +195,11 @@ def example_color_palettes():
     print("已保存: outputs/color_palettes.png")
     
     # 显示图表
-    plt.show()
+    if SHOW:
+        plt.show()
+    
+    # 释放图表占用的资源
+    plt.close(fig)
 
 def example_presets():
     """展示预设样式"""
@@ -164,9 +216,10 @@ def example_presets():
     fig, axes = plt.subplots(2, 2, figsize=(12, 10))
     axes = axes.flatten()
     
-    # 数据准备
+    # 数据准备（每个示例使用独立的固定种子随机数生成器，保证结果可复现）
+    rng = np.random.default_rng(42)
     x = np.linspace(0, 10, 20)
-    y = np.sin(x) * np.exp(-0.1 * x)
+    y = _damped_sine(x)
     categories = ['A', 'B', 'C', 'D', 'E']
     values = [3, 7, 5, 9, 4]
     
@@ -194,7 +247,7 @@ def example_presets():
                                                                            title="散点图预设",
                                                                            xlabel="X",
                                                                            ylabel="Y")
-            ax_scatter.scatter(x, y + 0.2 * np.random.randn(len(x)), **scatter_params)
+            ax_scatter.scatter(x, y + 0.2 * rng.standard_normal(len(x)), **scatter_params)
             
         elif preset_name == 'minimal_style':
             # 简洁风格预设
@@ -212,7 +265,11 @@ def example_presets():
     print("已保存: outputs/preset_examples.png")
     
     # 显示图表
-    plt.show()
+    if SHOW:
+        plt.show()
+    
+    # 释放图表占用的资源
+    plt.close(fig)
 
 def example_scientific_figure():
     """创建科研论文级别的图表"""
@@ -222,10 +279,10 @@ def example_scientific_figure():
     sv.themes.apply_theme('academic')
     
     # 准备数据
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
     x = np.linspace(0, 10, 50)
-    y1 = 0.5 * x + 0.5 * np.random.randn(50)
-    y2 = 0.3 * x**2 - 0.5 * x + 0.2 * np.random.randn(50)
+    y1 = 0.5 * x + 0.5 * rng.standard_normal(50)
+    y2 = 0.3 * x**2 - 0.5 * x + 0.2 * rng.standard_normal(50)
     
     # 创建复合图表布局
     fig, axes = sv.presets.create_composite_figure(layout_type='irregular', 
@@ -241,7 +298,7 @@ def example_scientific_figure():
     )
     
     # 绘制散点和拟合线
-    ax_scatter.scatter(x, y1, **scatter_params, label="实验数据")
+    ax_scatter.scatter(x, y1, **scatter_params, label="实验数据", rasterized=True)
     
     # 如果需要添加拟合线
     if trend_params['add']:
@@ -252,11 +309,20 @@ def example_scientific_figure():
             color=trend_params['color'],
             linestyle=trend_params['linestyle']
         )
+        # 残差基于图中绘制的拟合线
+        residuals = y1 - np.polyval(poly.coeffs, x)
+    
+    # 线性模型系数：已绘制线性拟合线时直接复用其系数，否则单独拟合一次
+    if trend_params['add'] and trend_params['order'] == 1:
+        slope, intercept = poly.coeffs
+    else:
+        slope, intercept = np.polyfit(x, y1, 1)
+    linear_pred = slope * x + intercept
     
-    # 添加R²值
-    from scipy import stats
-    slope, intercept, r_value, p_value, std_err = stats.linregress(x, y1)
-    r_squared = r_value**2
+    # 添加R²值（R² = 1 - 残差平方和 / 总平方和）
+    ss_res = np.sum((y1 - linear_pred) ** 2)
+    ss_tot = np.sum((y1 - y1.mean()) ** 2)
+    r_squared = 1 - ss_res / ss_tot
     
     sv.elements.add_textbox(ax_scatter, 0.05, 0.95, 
                            f"R² = {r_squared:.3f}\ny = {slope:.3f}x + {intercept:.3f}", 
@@ -264,8 +330,7 @@ def example_scientific_figure():
     
     # 残差图 (右上)
     if trend_params['add']:
-        residuals = y1 - poly(x)
-        axes[1].scatter(x, residuals, color=sv.colors.get_color('accent'), alpha=0.7)
+        axes[1].scatter(x, residuals, color=_color('accent'), alpha=0.7, rasterized=True)
         axes[1].axhline(y=0, linestyle='--', color='gray')
         axes[1].set_title("残差分析")
         axes[1].set_xlabel("X变量")
@@ -278,24 +343,22 @@ def example_scientific_figure():
         'dual_axis', fig=fig, ax=axes[2],
         title="模型比较", xlabel="X变量",
         y1label="线性模型", y2label="二次模型",
-        color1=sv.colors.get_color('primary'),
-        color2=sv.colors.get_color('secondary')
+        color1=_color('primary'),
+        color2=_color('secondary')
     )
     
     # 绘制线性模型预测
-    ax_left.scatter(x, y1, color=sv.colors.get_color('primary'), s=30, alpha=0.5)
-    linear_pred = slope * x + intercept
-    ax_left.plot(x, linear_pred, color=sv.colors.get_color('primary'), linestyle='-')
+    ax_left.scatter(x, y1, color=_color('primary'), s=30, alpha=0.5, rasterized=True)
+    ax_left.plot(x, linear_pred, color=_color('primary'), linestyle='-')
     
     # 绘制二次模型
-    ax_right.scatter(x, y2, color=sv.colors.get_color('secondary'), s=30, alpha=0.5)
+    ax_right.scatter(x, y2, color=_color('secondary'), s=30, alpha=0.5, rasterized=True)
     # 二次拟合
     coeffs2 = np.polyfit(x, y2, 2)
-    poly2 = np.poly1d(coeffs2)
-    x_fit = np.linspace(min(x), max(x), 100)
-    ax_right.plot(x_fit, poly2(x_fit), color=sv.colors.get_color('secondary'), linestyle='-')
+    x_fit = np.linspace(x[0], x[-1], 100)  # x由linspace生成，已按升序排列
+    ax_right.plot(x_fit, np.polyval(coeffs2, x_fit), color=_color('secondary'), linestyle='-')
     
-    # 添加水印
+    # 添加水印（散点已栅格化，保存为PDF/SVG时水印和文字仍为矢量）
     sv.elements.create_watermark(fig, "scivis示例", alpha=0.1, fontsize=36, rotation=30)
     
     # 保存图表
@@ -304,11 +367,16 @@ def example_scientific_figure():
     print("已保存: outputs/scientific_figure.png")
     
     # 显示图表
-    plt.show()
+    if SHOW:
+        plt.show()
+    
+    # 释放图表占用的资源
+    plt.close(fig)
 
-def example_custom_style():
-    """自定义样式示例"""
-    print("\n=== 自定义样式示例 ===")
+def _ensure_custom_theme():
+    """注册自定义调色板和主题（每个进程只注册一次）"""
+    if 'my_theme' in sv.themes.themes:
+        return
     
     # 创建自定义调色板
     sv.colors.create_custom_palette('my_palette', 
@@ -322,10 +390,15 @@ def example_custom_style():
         'figure.facecolor': '#f8f9fa',
         'axes.grid': True,
         'grid.alpha': 0.3,
-        'axes.prop_cycle': plt.cycler('color', sv.colors.get_palette('my_palette')),
+        'axes.prop_cycle': plt.cycler('color', _palette('my_palette')),
     })
+
+def example_custom_style():
+    """自定义样式示例"""
+    print("\n=== 自定义样式示例 ===")
     
-    # 应用自定义主题
+    # 注册并应用自定义主题
+    _ensure_custom_theme()
     sv.themes.apply_theme('my_theme')
     
     # 创建图表
@@ -335,12 +408,9 @@ def example_custom_style():
     categories = ['类别A', '类别B', '类别C', '类别D', '类别E']
     values = [25, 40, 30, 55, 45]
     
-    # 绘制条形图
-    bars = ax.bar(categories, values)
-    
-    # 为每个条形使用不同颜色
-    for i, bar in enumerate(bars):
-        bar.set_color(sv.colors.get_palette('my_palette')[i])
+    # 绘制条形图，每个条形使用调色板中的不同颜色
+    palette = _palette('my_palette')
+    bars = ax.bar(categories, values, color=palette[:len(categories)])
     
     # 设置标签
     ax.set_title("自定义样式示例", fontsize=14)
@@ -366,7 +436,11 @@ def example_custom_style():
     print("已保存: outputs/custom_style.png")
     
     # 显示图表
-    plt.show()
+    if SHOW:
+        plt.show()
+    
+    # 释放图表占用的资源
+    plt.close(fig)
 
 def example_composite_layout():
     """复合布局示例"""
@@ -386,9 +460,9 @@ def example_composite_layout():
     
     # 图1: 线图
     axes[0].set_title("线图")
-    x = np.linspace(0, 10, 100)
-    y = np.sin(x)
-    axes[0].plot(x, y, color=sv.colors.get_color('primary'))
+    x = _X100
+    y = _SIN
+    axes[0].plot(x, y, color=_color('primary'))
     sv.elements.set_labels(axes[0], xlabel="X", ylabel="sin(x)")
     sv.elements.set_grid(axes[0], style='default')
     
@@ -396,17 +470,17 @@ def example_composite_layout():
     axes[1].set_title("柱状图")
     categories = ['A', 'B', 'C', 'D', 'E']
     values = [3, 7, 5, 9, 4]
-    axes[1].bar(categories, values, color=sv.colors.get_palette('pastel'))
+    axes[1].bar(categories, values, color=_palette('pastel'))
     sv.elements.set_labels(axes[1], xlabel="类别", ylabel="值")
     sv.elements.set_grid(axes[1], style='dashed', axis='y')
     
     # 图3: 散点图
     axes[2].set_title("散点图")
-    np.random.seed(42)
-    x_scatter = np.random.rand(50)
-    y_scatter = np.random.rand(50)
-    sizes = np.random.rand(50) * 200 + 50
-    colors = sv.colors.get_palette('vibrant', n=50)
+    rng = np.random.default_rng(42)
+    x_scatter = rng.random(50)
+    y_scatter = rng.random(50)
+    sizes = rng.random(50) * 200 + 50
+    colors = _palette('vibrant', n=50)
     axes[2].scatter(x_scatter, y_scatter, s=sizes, c=colors, alpha=0.6)
     sv.elements.set_labels(axes[2], xlabel="X", ylabel="Y")
     sv.elements.set_grid(axes[2], style='dotted')
@@ -417,7 +491,7 @@ def example_composite_layout():
     sizes = [15, 30, 45, 10]
     explode = (0, 0.1, 0, 0)
     axes[3].pie(sizes, explode=explode, labels=labels, autopct='%1.1f%%',
-              shadow=True, startangle=90, colors=sv.colors.get_palette('pastel', n=4))
+              shadow=True, startangle=90, colors=_palette('pastel', n=4))
     axes[3].axis('equal')
     
     # 调整布局
@@ -429,7 +503,11 @@ def example_composite_layout():
     print("已保存: outputs/composite_layout.png")
     
     # 显示图表
-    plt.show()
+    if SHOW:
+        plt.show()
+    
+    # 释放图表占用的资源
+    plt.close(fig)
 
 def example_workflow_manager():
     """工作流管理示例"""
@@ -445,10 +523,14 @@ def example_workflow_manager():
     fig1, ax1 = manager.create_figure("temperature_plot", figsize=(8, 5))
     
     # 绘制温度数据
-    x = np.arange(0, 24, 1)  # 时间（小时）
-    temp = 20 + 5 * np.sin(np.pi * x / 12) + 2 * np.random.randn(24)  # 温度数据
-    
-    ax1.plot(x, temp, 'o-', color=sv.colors.get_color('primary'))
+    rng = np.random.default_rng(42)
+    x = np.arange(0, 24, dtype=np.float64)  # 时间（小时）
+    noise = np.empty(24)  # 噪声缓冲区，温度和湿度数据共用
+    rng.standard_normal(out=noise)
+    noise *= 2
+    temp = _daily_series(x, 20, 5, np.sin, noise)  # 温度数据
+    
+    ax1.plot(x, temp, 'o-', color=_color('primary'))
     sv.elements.set_labels(ax1, title="24小时温度变化", xlabel="时间 (小时)", ylabel="温度 (°C)")
     sv.elements.set_grid(ax1, style='default')
     
@@ -456,9 +538,11 @@ def example_workflow_manager():
     fig2, ax2 = manager.create_figure("humidity_plot", figsize=(8, 5))
     
     # 绘制湿度数据
-    humidity = 60 + 10 * np.cos(np.pi * x / 12) + 5 * np.random.randn(24)  # 湿度数据
+    rng.standard_normal(out=noise)
+    noise *= 5
+    humidity = _daily_series(x, 60, 10, np.cos, noise)  # 湿度数据
     
-    ax2.plot(x, humidity, 'o-', color=sv.colors.get_color('accent'))
+    ax2.plot(x, humidity, 'o-', color=_color('accent'))
     sv.elements.set_labels(ax2, title="24小时湿度变化", xlabel="时间 (小时)", ylabel="湿度 (%)")
     sv.elements.set_grid(ax2, style='dashed')
     
@@ -490,7 +574,8 @@ def example_workflow_manager():
     manager.save_session()
     
     # 显示图表
-    plt.show()
+    if SHOW:
+        plt.show()
     
     # 清理资源
     manager.clean_up()
@@ -498,10 +583,9 @@ def example_workflow_manager():
 def main():
     """运行所有示例"""
     # 确保输出目录存在
-    import os
     os.makedirs("outputs", exist_ok=True)
     
-    # 运行各个示例
+    # 按顺序运行各个示例（部分示例依赖前一个示例留下的主题和rcParams设置，不能并行运行）
     example_basic_usage()
     example_theme_comparison()
     example_color_palettes()
@@ -2,6 +2,7 @@
 颜色提取示例 - 从图片中提取颜色并创建调色板
 """
 import matplotlib.pyplot as plt
+import matplotlib.colors as mcolors
 import numpy as np
 import os
 from scivis_wrx.colors import colors
@@ -31,8 +32,8 @@ def plot_with_image_palette(image_path, palette_name='image_palette'):
     
     # 显示提取的颜色
     ax_palette = plt.subplot2grid((2, 3), (0, 1), colspan=2, rowspan=1)
-    for i, color in enumerate(extracted_colors):
-        ax_palette.add_patch(plt.Rectangle((i, 0), 1, 1, color=color))
+    swatches = np.array([[mcolors.to_rgb(color) for color in extracted_colors]])
+    ax_palette.imshow(swatches, aspect='auto', extent=(0, len(extracted_colors), 0, 1))
     
     ax_palette.set_xlim(0, len(extracted_colors))
     ax_palette.set_ylim(0, 1)
@@ -15,8 +15,7 @@ class Theme:
     
     def apply(self) -> None:
         """应用主题到matplotlib rcParams"""
-        for key, value in self.params.items():
-            plt.rcParams[key] = value
+        plt.rcParams.update(self.params)
 
 class ThemeManager:
     """主题管理器类"""
@@ -181,24 +181,19 @@ class VisualizationUtils:
     def auto_label_bars(ax, bars, fmt='{:.2f}', fontsize=8, rotation=0, 
                        position='top', padding=3):
         """自动为柱状图添加数值标签"""
+        # 标签位置只需判断一次：纵向对齐方式、偏移量以及标签高度相对柱高的比例
+        if position == 'top':
+            va, y_offset, y_scale = 'bottom', padding, 1
+        elif position == 'middle':
+            va, y_offset, y_scale = 'center', 0, 0.5
+        elif position == 'bottom':
+            va, y_offset, y_scale = 'top', -padding, 0
+        else:
+            raise ValueError(f"不支持的位置: {position}")
+        
         for bar in bars:
             height = bar.get_height()
-            
-            # 设置标签位置
-            if position == 'top':
-                xy = (bar.get_x() + bar.get_width() / 2, height)
-                va = 'bottom'
-                y_offset = padding
-            elif position == 'middle':
-                xy = (bar.get_x() + bar.get_width() / 2, height / 2)
-                va = 'center'
-                y_offset = 0
-            elif position == 'bottom':
-                xy = (bar.get_x() + bar.get_width() / 2, 0)
-                va = 'top'
-                y_offset = -padding
-            else:
-                raise ValueError(f"不支持的位置: {position}")
+            xy = (bar.get_x() + bar.get_width() / 2, height * y_scale)
             
             # 添加标签
             label = fmt.format(height)